@@ -9,14 +9,23 @@ from pathlib import Path
 import logging
 import time
 import json
+import tempfile
+import shutil
+import threading
+import queue
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 # Add current directory to Python path
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
-# Set up basic logging
+# Set up basic logging (unknown LOG_LEVEL values fall back to INFO)
+log_level = os.getenv('LOG_LEVEL', 'INFO').upper()
+if not isinstance(logging.getLevelName(log_level), int):
+    log_level = 'INFO'
 logging.basicConfig(
-    level=logging.INFO,
+    level=log_level,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
@@ -34,6 +43,21 @@ try:
     import base64
     from transformers import AutoImageProcessor, AutoModelForImageClassification
     
+    # Optional: decord decodes straight into batched RGB arrays
+    try:
+        from decord import VideoReader, cpu as decord_cpu
+        DECORD_AVAILABLE = True
+    except ImportError:
+        DECORD_AVAILABLE = False
+    
+    # Optional: batch-inference groups concurrent requests into one forward pass
+    try:
+        from batch_inference import batching
+        from batch_inference.batcher.concat_batcher import ConcatBatcher
+        BATCHING_AVAILABLE = True
+    except ImportError:
+        BATCHING_AVAILABLE = False
+    
     # Load environment variables
     load_dotenv()
     
@@ -57,11 +81,149 @@ try:
     # Global variables for ML components
     ml_model = None
     ml_processor = None
+    ort_session = None
+    batch_host = None
+    model_accepts_lengths = False
     model_loaded = False
+    model_load_lock = threading.Lock()
+    
+    # Pool of reusable model input buffers, see acquire_input_buffers()
+    input_buffers = queue.Queue()
+    
+    # Background inference workers for asynchronous /analyze jobs
+    inference_executor = ThreadPoolExecutor(
+        max_workers=int(os.getenv('INFERENCE_WORKERS', '2')),
+        thread_name_prefix='inference'
+    )
+    analysis_jobs = {}
+    analysis_jobs_lock = threading.Lock()
+    ANALYSIS_JOB_TTL = 600  # seconds a finished job is kept for polling
+    UPLOAD_COPY_BUFFER = 1 << 20  # 1MB chunks when spooling uploads to disk
+    TEMP_VIDEO_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None  # tmpfs for decode input
+    
+    # Inference device and precision (FP16 on CUDA, FP32 on CPU)
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    model_dtype = torch.float16 if device.type == 'cuda' else torch.float32
+    
+    # Input shapes are fixed, so let cuDNN pick the fastest conv algorithms once
+    torch.backends.cudnn.benchmark = True
+    
+    def load_onnx_session(model, model_path, cache_dir, sequence_length=20, im_size=112):
+        """Export the model to ONNX once per checkpoint and open it with ONNX Runtime"""
+        import onnxruntime
+        
+        onnx_path = os.path.join(cache_dir, 'model.onnx')
+        # Re-export when the checkpoint is newer than the exported graph
+        if not os.path.exists(onnx_path) or os.path.getmtime(onnx_path) < os.path.getmtime(model_path):
+            logger.info("📦 Exporting model to ONNX...")
+            model_device = next(model.parameters()).device
+            dummy = torch.randn(1, sequence_length, 3, im_size, im_size, device=model_device)
+            # Fixed input shape, no dynamic axes: lets the runtime specialize the graph
+            try:
+                torch.onnx.export(
+                    model, dummy, onnx_path,
+                    opset_version=17,
+                    input_names=['pixel_values'],
+                    output_names=['logits']
+                )
+            except Exception:
+                # Never leave a partial export behind to be picked up by a later load
+                if os.path.exists(onnx_path):
+                    os.remove(onnx_path)
+                raise
+        
+        # TensorRT builds its FP16 engine on first use and caches it next to the ONNX file
+        preferred = [
+            ('TensorrtExecutionProvider', {
+                'trt_engine_cache_enable': True,
+                'trt_engine_cache_path': cache_dir,
+                'trt_fp16_enable': True
+            }),
+            ('CUDAExecutionProvider', {}),
+            ('CPUExecutionProvider', {})
+        ]
+        available = onnxruntime.get_available_providers()
+        providers = [p for p in preferred if p[0] in available]
+        session = onnxruntime.InferenceSession(onnx_path, providers=providers)
+        logger.info(f"✅ Using ONNX Runtime ({session.get_providers()[0]})")
+        return session
+    
+    def compile_model(model, sequence_length=20, im_size=112):
+        """Compile the CNN backbone and warm it up so the first request does not pay for compilation
+        
+        Dynamo cannot trace nn.LSTM, so the LSTM and linear head stay eager; the
+        backbone is where nearly all of the compute is anyway. CUDA graphs
+        ('reduce-overhead') are not used: their state is per thread, and requests
+        run on other threads than this warm-up.
+        
+        The frame dimension is compiled as dynamic, so batched inputs of any
+        multiple of sequence_length frames reuse the same graph.
+        """
+        backbone = model.model
+        model.model = torch.compile(backbone, fullgraph=True)
+        
+        try:
+            with torch.inference_mode(), torch.autocast(device_type=device.type, dtype=torch.float16,
+                                                        enabled=device.type == 'cuda'):
+                # Created in inference mode like the flattened request frames, so guards match
+                frames = torch.randn(sequence_length, 3, im_size, im_size, device=device, dtype=model_dtype)
+                frames = frames.contiguous(memory_format=torch.channels_last)
+                torch._dynamo.mark_dynamic(frames, 0)
+                model.model(frames)
+                model(torch.randn(1, sequence_length, 3, im_size, im_size, device=device, dtype=model_dtype))
+        except Exception:
+            # Leave the model runnable in eager mode
+            model.model = backbone
+            raise
+        
+        return model
+    
+    def create_batch_host(model, max_batch_size=8):
+        """Start a batching host that stacks concurrent (1, 20, 3, 112, 112) inputs into one forward pass"""
+        
+        @batching(batcher=ConcatBatcher(), max_batch_size=max_batch_size)
+        class BatchedDetector:
+            def __init__(self, model):
+                self.model = model
+            
+            def predict_batch(self, x):
+                # Runs on the host's worker thread, so the inference context is entered here
+                x = torch.from_numpy(x).to(device, dtype=model_dtype, non_blocking=True)
+                with torch.inference_mode(), torch.autocast(device_type=device.type, dtype=torch.float16,
+                                                            enabled=device.type == 'cuda'):
+                    return extract_logits(self.model(x)).float().cpu().numpy()
+        
+        host = BatchedDetector.host(model)
+        # Wait up to 20ms for concurrent requests; the decorator does not expose this
+        host.wait_ms = 20
+        # The host's worker threads are not daemonic and would keep the process alive
+        # on shutdown; threads inherit the daemon flag, so start them from a daemon thread
+        start_errors = []
+        
+        def start_host():
+            try:
+                host.start()
+            except Exception as e:
+                start_errors.append(e)
+        
+        starter = threading.Thread(target=start_host, daemon=True)
+        starter.start()
+        starter.join()
+        if start_errors:
+            raise start_errors[0]
+        return host
     
     def load_huggingface_model():
-        """Load the custom Hugging Face deepfake detection model"""
-        global ml_model, ml_processor, model_loaded
+        """Load the model once; concurrent first callers wait for the same load"""
+        if model_loaded:
+            return True
+        
+        with model_load_lock:
+            return load_model_components()
+    
+    def load_model_components():
+        """Load the custom Hugging Face deepfake detection model (call with model_load_lock held)"""
+        global ml_model, ml_processor, ort_session, batch_host, model_accepts_lengths, model_loaded
         
         if model_loaded:
             return True
@@ -83,7 +245,7 @@ try:
             logger.info("🔑 Using authentication token")
             
             # Download custom model files (cached)
-            from huggingface_hub import hf_hub_download
+            from model_files import fetch_model_files
             
             logger.info("Downloading/Loading cached model files...")
             
@@ -93,31 +255,7 @@ try:
             
             try:
                 # Download required files (will use cache if already downloaded)
-                files_to_download = [
-                    'modeling_deepfake.py',
-                    'processor_deepfake.py', 
-                    'model_87_acc_20_frames_final_data.pt',
-                    'config.json'
-                ]
-                
-                downloaded_files = {}
-                for filename in files_to_download:
-                    local_path = os.path.join(cache_dir, filename)
-                    
-                    if os.path.exists(local_path):
-                        logger.info(f"✅ Using cached {filename}")
-                        downloaded_files[filename] = local_path
-                    else:
-                        logger.info(f"📥 Downloading {filename}...")
-                        file_path = hf_hub_download(
-                            repo_id=model_name,
-                            filename=filename,
-                            token=hf_token,
-                            local_dir=cache_dir,
-                            local_dir_use_symlinks=False
-                        )
-                        downloaded_files[filename] = file_path
-                        logger.info(f"✅ Downloaded {filename}")
+                downloaded_files = fetch_model_files(model_name, hf_token, cache_dir, log=logger.info)
                 
                 # Add cache directory to Python path
                 sys.path.insert(0, cache_dir)
@@ -128,20 +266,70 @@ try:
                 logger.info("Loading model...")
                 model_path = downloaded_files['model_87_acc_20_frames_final_data.pt']
                 
+                use_onnxruntime = os.getenv('USE_ONNXRUNTIME', '0') == '1'
+                # Dynamically quantized modules cannot be exported to ONNX
+                quantize = (os.getenv('QUANTIZE_CPU', '1') == '1' and device.type == 'cpu'
+                            and not use_onnxruntime)
+                
                 try:
                     # Try original complex model
                     from modeling_deepfake import DeepFakeDetectorModel
                     ml_model = DeepFakeDetectorModel.from_pretrained(model_path)
+                    is_original_model = True
                     logger.info("✅ Using original complex model")
                 except Exception as model_error:
                     logger.warning(f"Original model failed: {model_error}")
                     logger.info("Using correct model architecture...")
                     from correct_model import DeepFakeDetector
-                    ml_model = DeepFakeDetector.load_from_file(model_path)
+                    ml_model = DeepFakeDetector.load_from_file(
+                        model_path,
+                        device=device,
+                        quantize=quantize
+                    )
+                    is_original_model = False
+                    model_accepts_lengths = True
                     logger.info("✅ Using correct model architecture")
                 
                 ml_model.eval()
                 
+                if use_onnxruntime:
+                    try:
+                        ort_session = load_onnx_session(ml_model, model_path, cache_dir)
+                    except Exception as onnx_error:
+                        logger.warning(f"ONNX Runtime unavailable, using PyTorch: {onnx_error}")
+                        ort_session = None
+                
+                ml_model = ml_model.to(device, memory_format=torch.channels_last)
+                logger.info(f"🖥️ Model running on {device}")
+                
+                if device.type == 'cuda':
+                    # Half precision halves weight bandwidth and runs on tensor cores
+                    ml_model = ml_model.half()
+                    logger.info("⚡ Using FP16 inference on CUDA")
+                
+                # Only the known DeepFakeDetector layout is compiled; the original model
+                # stays eager. Quantized layers sit in the eager LSTM and linear head.
+                if (os.getenv('TORCH_COMPILE', '1') == '1' and hasattr(torch, 'compile')
+                        and ort_session is None and not is_original_model):
+                    try:
+                        ml_model = compile_model(ml_model)
+                        # Batches of full clips share one graph, but clips shorter than
+                        # 16 frames hit separate backbone specializations and recompile
+                        model_accepts_lengths = False
+                        logger.info("✅ Using torch.compile")
+                    except Exception as compile_error:
+                        logger.warning(f"torch.compile failed, using eager mode: {compile_error}")
+                
+                # The batching host exchanges numpy arrays, so on CUDA every request would
+                # copy its device-resident input to the host and back; batch on CPU only
+                if (os.getenv('BATCH_INFERENCE', '1') == '1' and BATCHING_AVAILABLE
+                        and ort_session is None and device.type == 'cpu'):
+                    try:
+                        batch_host = create_batch_host(ml_model)
+                        logger.info("✅ Batching concurrent requests")
+                    except Exception as batching_error:
+                        logger.warning(f"Request batching unavailable: {batching_error}")
+                
                 # Try to use the original processor, fallback to simple one
                 try:
                     from processor_deepfake import DeepFakeProcessor
@@ -151,9 +339,12 @@ try:
                     logger.warning(f"Original processor failed: {e}")
                     logger.info("Using simplified processor without face detection")
                     from simple_processor import SimpleDeepFakeProcessor
-                    ml_processor = SimpleDeepFakeProcessor()
+                    ml_processor = SimpleDeepFakeProcessor(device=device)
                     logger.info("✅ Using simplified processor")
                 
+                # Pre-allocate the first input buffer pair so requests skip allocation
+                release_input_buffers(acquire_input_buffers())
+                
                 model_loaded = True
                 logger.info("🎉 Custom Hugging Face model loaded successfully!")
                 logger.info(f"💾 Model files cached for future use")
@@ -173,51 +364,166 @@ try:
                 logger.error("   Please request access at: https://huggingface.co/Naman712/Deep-fake-detection")
             return False
     
-    def extract_frames_from_video(video_file, max_frames=20):
-        """Extract frames from uploaded video"""
+    def sample_frame_indices(total_frames, max_frames):
+        """Indices of at most max_frames frames evenly distributed across the video, as Python ints"""
+        return np.linspace(0, total_frames - 1, min(max_frames, total_frames), dtype=int).tolist()
+    
+    def read_frames_decord(video_path, max_frames, frame_size=None):
+        """Decode evenly spaced frames straight into an (N, H, W, 3) RGB array with decord"""
+        vr = VideoReader(video_path, ctx=decord_cpu(0))
+        total_frames = len(vr)
+        if total_frames == 0:
+            return None
+        
+        frames = vr.get_batch(sample_frame_indices(total_frames, max_frames)).asnumpy()
+        if frame_size:
+            # Resize like the OpenCV path; the decoder's own scaler filters differently
+            resized = np.empty((len(frames), frame_size, frame_size, 3), dtype=np.uint8)
+            for i, frame in enumerate(frames):
+                cv2.resize(frame, (frame_size, frame_size), dst=resized[i], interpolation=cv2.INTER_AREA)
+            frames = resized
+        return frames
+    
+    def read_frames_opencv(video_path, max_frames, frame_size=None):
+        """Decode evenly spaced frames into an (N, H, W, 3) RGB array with OpenCV"""
+        cap = cv2.VideoCapture(video_path)
+        frames = []
+        
         try:
-            # Save uploaded file temporarily
-            temp_path = f"temp_video_{int(time.time())}.mp4"
-            video_file.save(temp_path)
-            
-            # Open video with OpenCV
-            cap = cv2.VideoCapture(temp_path)
-            frames = []
-            
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
             if total_frames == 0:
-                logger.error("No frames found in video")
-                return []
+                return None
             
-            # Extract frames evenly distributed across the video
-            frame_indices = np.linspace(0, total_frames - 1, min(max_frames, total_frames), dtype=int)
+            frame_indices = sample_frame_indices(total_frames, max_frames)
+            target_set = set(frame_indices)
+            last_target = frame_indices[-1]
             
-            for i, frame_idx in enumerate(frame_indices):
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-                ret, frame = cap.read()
-                
-                if ret:
-                    # Convert BGR to RGB
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    # Convert to PIL Image
-                    frame_pil = Image.fromarray(frame)
-                    frames.append(frame_pil)
-                
-                if len(frames) >= max_frames:
+            # Decode sequentially instead of seeking to each index: seeking makes the
+            # decoder restart from the previous keyframe for every target frame.
+            # grab() advances without converting the frame, retrieve() only runs for targets.
+            for i in range(last_target + 1):
+                if not cap.grab():
                     break
-            
+                
+                if i in target_set:
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        if frame_size:
+                            # Resize first so the colour conversion runs on the small frame
+                            frame = cv2.resize(frame, (frame_size, frame_size), interpolation=cv2.INTER_AREA)
+                        # Convert BGR to RGB
+                        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        finally:
             cap.release()
+        
+        return np.stack(frames) if frames else None
+    
+    def save_upload_to_temp(video_file):
+        """Spool an upload to a temporary file and return its path
+        
+        tmpfs is tried first; it can be smaller than MAX_CONTENT_LENGTH (Docker's
+        /dev/shm is 64MB), so when it runs out of space the default temp dir is used.
+        """
+        temp_dirs = [TEMP_VIDEO_DIR, None] if TEMP_VIDEO_DIR else [None]
+        for temp_dir in temp_dirs:
+            fd, temp_path = tempfile.mkstemp(suffix='.mp4', dir=temp_dir)
+            try:
+                with os.fdopen(fd, 'wb') as temp_file:
+                    video_file.stream.seek(0)
+                    shutil.copyfileobj(video_file.stream, temp_file, length=UPLOAD_COPY_BUFFER)
+            except OSError as e:
+                os.remove(temp_path)
+                if temp_dir is None:
+                    raise
+                logger.warning(f"Could not spool upload to {temp_dir} ({e}), using the default temp dir")
+                continue
+            except Exception:
+                os.remove(temp_path)
+                raise
+            return temp_path
+    
+    def extract_frames_from_video(video_file, max_frames=20, frame_size=None):
+        """Extract frames from uploaded video as a uint8 (N, H, W, 3) RGB array
+        
+        When frame_size is given, frames are resized to frame_size x frame_size while decoding.
+        """
+        try:
+            temp_path = save_upload_to_temp(video_file)
             
-            # Clean up temp file
-            if os.path.exists(temp_path):
+            try:
+                if DECORD_AVAILABLE:
+                    frames = read_frames_decord(temp_path, max_frames, frame_size)
+                else:
+                    frames = read_frames_opencv(temp_path, max_frames, frame_size)
+            finally:
+                # Clean up temp file
                 os.remove(temp_path)
             
+            if frames is None:
+                logger.error("No frames found in video")
+                return None
+            
             logger.info(f"Extracted {len(frames)} frames from video")
             return frames
             
         except Exception as e:
             logger.error(f"Error extracting frames: {e}")
-            return []
+            return None
+    
+    def acquire_input_buffers(sequence_length=20, im_size=112):
+        """Take a (pinned staging, device input) buffer pair from the pool, allocating one if empty
+        
+        The pool grows to the peak number of concurrent analyses and is reused afterwards.
+        Staging is None when inference runs on the CPU.
+        """
+        try:
+            return input_buffers.get_nowait()
+        except queue.Empty:
+            shape = (1, sequence_length, 3, im_size, im_size)
+            staging = torch.empty(shape, dtype=torch.float32, pin_memory=True) if device.type == 'cuda' else None
+            return staging, torch.empty(shape, device=device, dtype=model_dtype)
+    
+    def release_input_buffers(buffers):
+        """Return a buffer pair to the pool once the model is done with it"""
+        input_buffers.put(buffers)
+    
+    def run_model(frames_tensor, num_frames):
+        """Run the loaded model on a (1, 20, 3, 112, 112) tensor and return logits
+        
+        num_frames is the number of real frames before padding; models that accept
+        lengths skip the padded frames entirely.
+        """
+        if ort_session is not None:
+            if frames_tensor.is_cuda and ort_session.get_providers()[0] != 'CPUExecutionProvider':
+                # Bind the device tensor directly instead of copying it to the host and back;
+                # the exported graph is FP32
+                frames_tensor = frames_tensor.float().contiguous()
+                binding = ort_session.io_binding()
+                binding.bind_input('pixel_values', 'cuda', frames_tensor.device.index or 0, np.float32,
+                                   tuple(frames_tensor.shape), frames_tensor.data_ptr())
+                binding.bind_output('logits')
+                ort_session.run_with_iobinding(binding)
+                return torch.from_numpy(binding.copy_outputs_to_cpu()[0])
+            logits = ort_session.run(['logits'], {'pixel_values': frames_tensor.float().cpu().numpy()})[0]
+            return torch.from_numpy(logits)
+        
+        if batch_host is not None:
+            return torch.from_numpy(batch_host.predict(frames_tensor.cpu().numpy()))
+        
+        if model_accepts_lengths and num_frames < frames_tensor.shape[1]:
+            return extract_logits(ml_model(frames_tensor, lengths=torch.tensor([num_frames])))
+        
+        return extract_logits(ml_model(frames_tensor))
+    
+    def extract_logits(outputs):
+        """Get logits from any of the supported model output formats"""
+        # Handle different output formats
+        if hasattr(outputs, 'logits'):
+            # Complex model with SequenceClassifierOutput
+            return outputs.logits
+        else:
+            # Simple model returns logits directly
+            return outputs
     
     def analyze_video_frames(frames):
         """Analyze video frames for deepfake detection using custom model"""
@@ -226,56 +532,54 @@ try:
                 logger.error("Model or processor not loaded")
                 return None
             
-            logger.info(f"Analyzing {len(frames)} frames...")
+            logger.debug("Analyzing %d frames...", len(frames))
             
-            # Process frames using custom processor
-            processed_frames = []
-            for frame in frames:
-                processed_frame = ml_processor.preprocess_frame(frame)
-                processed_frames.append(processed_frame)
+            # Process all frames in a single batched pass when the processor supports it
+            if hasattr(ml_processor, 'preprocess_batch'):
+                processed_frames = ml_processor.preprocess_batch(frames)  # Shape: (N, 3, 112, 112)
+            else:
+                processed_frames = torch.stack([ml_processor.preprocess_frame(Image.fromarray(frame))
+                                                for frame in frames])
             
             # Ensure we have exactly 20 frames (model requirement from README)
             sequence_length = 20
-            if len(processed_frames) >= sequence_length:
+            num_frames = processed_frames.shape[0]
+            if num_frames >= sequence_length:
                 # Take evenly distributed frames across the video
-                indices = np.linspace(0, len(processed_frames) - 1, sequence_length, dtype=int)
-                batch_frames = [processed_frames[i] for i in indices]
+                indices = np.linspace(0, num_frames - 1, sequence_length, dtype=int)
             else:
-                # Pad with repeated frames if less than 20
-                batch_frames = processed_frames.copy()
-                while len(batch_frames) < sequence_length:
-                    batch_frames.append(batch_frames[-1] if batch_frames else torch.zeros((3, 112, 112)))
-                batch_frames = batch_frames[:sequence_length]
-            
-            # Stack frames into tensor with correct shape
-            frames_tensor = torch.stack(batch_frames)  # Shape: (20, 3, 112, 112)
-            frames_tensor = frames_tensor.unsqueeze(0)  # Shape: (1, 20, 3, 112, 112)
+                # Pad with repeated last frame if less than 20
+                indices = np.minimum(np.arange(sequence_length), num_frames - 1)
+            batch_frames = processed_frames[torch.from_numpy(indices).to(processed_frames.device)]
             
-            logger.info(f"Input tensor shape: {frames_tensor.shape}")
-            
-            # Run inference (handle different model output formats)
-            with torch.no_grad():
-                outputs = ml_model(frames_tensor)
-                
-                # Handle different output formats
-                if hasattr(outputs, 'logits'):
-                    # Complex model with SequenceClassifierOutput
-                    logits = outputs.logits
-                elif isinstance(outputs, tuple):
-                    # Original model returns (fmap, logits)
-                    fmap, logits = outputs
+            # Fill a reusable input buffer on the inference device
+            buffers = acquire_input_buffers()
+            try:
+                staging, frames_tensor = buffers  # Shape: (1, 20, 3, 112, 112)
+                if batch_frames.device.type == 'cpu' and staging is not None:
+                    # Stage through pinned memory so the H2D copy is asynchronous
+                    staging[0].copy_(batch_frames)
+                    frames_tensor.copy_(staging, non_blocking=True)
                 else:
-                    # Simple model returns logits directly
-                    logits = outputs
-                
-                probs = F.softmax(logits, dim=1).cpu().numpy()[0]
+                    frames_tensor[0].copy_(batch_frames, non_blocking=True)
                 
-                # Get prediction (0: real, 1: fake)
-                prediction = int(np.argmax(probs))
-                confidence = float(probs[prediction])
+                logger.debug("Input tensor shape: %s", tuple(frames_tensor.shape))
                 
-                logger.info(f"Model output - Prediction: {prediction}, Confidence: {confidence:.3f}")
-                logger.info(f"Raw probabilities: Real={probs[0]:.3f}, Fake={probs[1]:.3f}")
+                # Run inference
+                with torch.inference_mode(), torch.autocast(device_type=device.type, dtype=torch.float16,
+                                                            enabled=device.type == 'cuda'):
+                    logits = run_model(frames_tensor, min(num_frames, sequence_length))
+                    
+                    # Softmax in FP32 for stable probabilities
+                    probs = F.softmax(logits.float(), dim=1).cpu().numpy()[0]
+            finally:
+                release_input_buffers(buffers)
+            
+            # Get prediction (0: real, 1: fake)
+            prediction = int(np.argmax(probs))
+            confidence = float(probs[prediction])
+            
+            logger.debug("Raw probabilities: Real=%.3f, Fake=%.3f", probs[0], probs[1])
             
             # Format results
             is_deepfake = prediction == 1  # 1 = fake
@@ -298,13 +602,52 @@ try:
             logger.info(f"Analysis complete: {'FAKE' if is_deepfake else 'REAL'} (confidence: {confidence:.3f})")
             return result
                 
-        except Exception as e:
-            logger.error(f"Error in video analysis: {e}")
-            logger.error(f"Error details: {type(e).__name__}: {str(e)}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+        except Exception:
+            logger.exception("Error in video analysis")
             return None
     
+    def submit_analysis_job(frames):
+        """Queue frames for inference on the background worker and return the job id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        
+        with analysis_jobs_lock:
+            # Drop finished jobs nobody came back for
+            for stale_id in [jid for jid, job in analysis_jobs.items()
+                             if job['future'].done() and now - job['created'] > ANALYSIS_JOB_TTL]:
+                del analysis_jobs[stale_id]
+            
+            analysis_jobs[job_id] = {
+                'future': inference_executor.submit(analyze_video_frames, frames),
+                'frames_analyzed': len(frames),
+                'created': now
+            }
+        
+        return job_id
+    
+    def analysis_response(analysis_id, analysis_result, frames_analyzed):
+        """Build the JSON response for a finished analysis"""
+        if analysis_result is None:
+            return jsonify({
+                'success': False,
+                'error': 'Analysis failed'
+            }), 500
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'analysis_id': analysis_id,
+                'status': 'completed',
+                'result': analysis_result,
+                'frames_analyzed': frames_analyzed,
+                'model_info': {
+                    'name': os.getenv('MODEL_NAME', 'Naman712/Deep-fake-detection'),
+                    'type': 'huggingface'
+                },
+                'timestamp': time.time()
+            }
+        })
+    
     @app.before_request
     def before_request():
         """Set up request context"""
@@ -316,7 +659,7 @@ try:
         """Log request completion"""
         if hasattr(g, 'start_time'):
             duration = time.time() - g.start_time
-            logger.info(f"Request {g.request_id} completed in {duration:.3f}s")
+            logger.debug("Request %s completed in %.3fs", g.request_id, duration)
         return response
     
     @app.route('/health', methods=['GET'])
@@ -342,7 +685,7 @@ try:
                         'model_type': 'huggingface',
                         'model_name': os.getenv('MODEL_NAME', 'Naman712/Deep-fake-detection')
                     },
-                    'endpoints': ['/health', '/upload', '/analyze']
+                    'endpoints': ['/health', '/upload', '/analyze', '/result/<analysis_id>']
                 }
             })
             
@@ -371,16 +714,18 @@ try:
                     'error': 'No video file selected'
                 }), 400
             
+            # Measure size by seeking instead of reading the whole upload into memory
+            video_file.stream.seek(0, os.SEEK_END)
+            size = video_file.stream.tell()
+            video_file.stream.seek(0)
+            
             # Store file info for analysis
             file_info = {
                 'filename': video_file.filename,
-                'size': len(video_file.read()),
+                'size': size,
                 'upload_id': g.request_id
             }
             
-            # Reset file pointer
-            video_file.seek(0)
-            
             return jsonify({
                 'success': True,
                 'data': {
@@ -402,8 +747,7 @@ try:
     def analyze_video():
         """Analyze video for deepfakes using Hugging Face model"""
         try:
-            logger.info("Starting video analysis...")
-            logger.info(f"Model loaded status: {model_loaded}")
+            logger.debug("Starting video analysis (model loaded: %s)", model_loaded)
             
             # Load model if not already loaded
             if not load_huggingface_model():
@@ -419,37 +763,33 @@ try:
                 video_file = request.files['video']
                 
                 # Extract frames from video
-                frames = extract_frames_from_video(video_file)
+                # The simplified processor only needs model-sized frames; the original
+                # processor runs face detection and needs full resolution
+                frame_size = ml_processor.im_size if hasattr(ml_processor, 'preprocess_batch') else None
+                frames = extract_frames_from_video(video_file, frame_size=frame_size)
                 
-                if not frames:
+                if frames is None:
                     return jsonify({
                         'success': False,
                         'error': 'Could not extract frames from video'
                     }), 400
                 
+                # Asynchronous mode: queue inference and return a job id right away
+                if request.args.get('async') == '1':
+                    job_id = submit_analysis_job(frames)
+                    return jsonify({
+                        'success': True,
+                        'data': {
+                            'analysis_id': job_id,
+                            'status': 'processing',
+                            'result_url': f'/result/{job_id}'
+                        }
+                    }), 202
+                
                 # Analyze frames
                 analysis_result = analyze_video_frames(frames)
                 
-                if analysis_result is None:
-                    return jsonify({
-                        'success': False,
-                        'error': 'Analysis failed'
-                    }), 500
-                
-                return jsonify({
-                    'success': True,
-                    'data': {
-                        'analysis_id': g.request_id,
-                        'status': 'completed',
-                        'result': analysis_result,
-                        'frames_analyzed': len(frames),
-                        'model_info': {
-                            'name': os.getenv('MODEL_NAME', 'Naman712/Deep-fake-detection'),
-                            'type': 'huggingface'
-                        },
-                        'timestamp': time.time()
-                    }
-                })
+                return analysis_response(g.request_id, analysis_result, len(frames))
             
             else:
                 # Return error if no video provided
@@ -466,6 +806,31 @@ try:
                 'message': str(e)
             }), 500
     
+    @app.route('/result/<job_id>', methods=['GET'])
+    def get_analysis_result(job_id):
+        """Poll the result of an asynchronous analysis job"""
+        with analysis_jobs_lock:
+            job = analysis_jobs.get(job_id)
+            if job is not None and job['future'].done():
+                del analysis_jobs[job_id]
+        
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': 'Unknown analysis id'
+            }), 404
+        
+        if not job['future'].done():
+            return jsonify({
+                'success': True,
+                'data': {
+                    'analysis_id': job_id,
+                    'status': 'processing'
+                }
+            }), 202
+        
+        return analysis_response(job_id, job['future'].result(), job['frames_analyzed'])
+    
     @app.route('/debug-model', methods=['POST'])
     def debug_model():
         """Run debug tests on the Hugging Face model"""
@@ -539,7 +904,8 @@ try:
             'endpoints': {
                 'health': '/health',
                 'upload': '/upload (POST)',
-                'analyze': '/analyze (POST)',
+                'analyze': '/analyze (POST, ?async=1 for a job id)',
+                'result': '/result/<analysis_id>',
                 'debug-model': '/debug-model (POST)'
             }
         })
@@ -560,6 +926,12 @@ try:
             'message': 'Something went wrong on our end'
         }), 500
     
+    # Load the model at startup so the first request does not pay the cold start.
+    # With the debug reloader, only the child process that serves requests loads it.
+    if os.getenv('EAGER_MODEL_LOAD', '1') == '1' and (
+            __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        load_huggingface_model()
+    
     if __name__ == '__main__':
         print("🚀 Starting Deepfake Detection Backend (Hugging Face Model)...")
         print(f"📁 Working directory: {current_dir}")
@@ -1,6 +1,9 @@
 """
 Correct model architecture that matches the trained weights
 """
+import os
+import tempfile
+
 import torch
 import torch.nn as nn
 import torchvision.models as models
@@ -9,7 +12,8 @@ class DeepFakeDetector(nn.Module):
     def __init__(self, num_classes=2, latent_dim=2048, lstm_layers=1, hidden_dim=2048, bidirectional=False):
         super(DeepFakeDetector, self).__init__()
         # Use the exact same architecture as the original
-        model = models.resnext50_32x4d(weights='IMAGENET1K_V1')  # Updated parameter name
+        # No pretrained weights: the full state dict is loaded from the checkpoint
+        model = models.resnext50_32x4d(weights=None)
         self.model = nn.Sequential(*list(model.children())[:-2])
         self.lstm = nn.LSTM(latent_dim, hidden_dim, lstm_layers, bidirectional)
         self.relu = nn.LeakyReLU()
@@ -17,20 +21,60 @@ class DeepFakeDetector(nn.Module):
         self.linear1 = nn.Linear(2048, num_classes)  # Note: linear1, not classifier
         self.avgpool = nn.AdaptiveAvgPool2d(1)
 
-    def forward(self, x):
-        batch_size, seq_length, c, h, w = x.shape
-        x = x.view(batch_size * seq_length, c, h, w)
+    def forward(self, x, lengths=None):
+        """
+        Args:
+            x: Frames of shape (batch, seq, c, h, w)
+            lengths: Optional CPU tensor with the number of real (unpadded) frames
+                per sequence; padded frames are skipped by the backbone and the
+                logits are taken at the last real frame.
+        
+        Returns:
+            torch.Tensor: Logits of shape (batch, num_classes)
+        """
+        x, batch_size, seq_length = self._flatten_frames(x, lengths)
+        # The feature map is pooled right away so it can be freed during inference
+        x = self.avgpool(self.model(x))
+        return self._classify(x, batch_size, seq_length, lengths)
+    
+    def forward_with_fmap(self, x, lengths=None):
+        """Same as forward, but also returns the backbone feature map (e.g. for GradCAM)."""
+        x, batch_size, seq_length = self._flatten_frames(x, lengths)
         fmap = self.model(x)
         x = self.avgpool(fmap)
-        x = x.view(batch_size, seq_length, 2048)
+        return fmap, self._classify(x, batch_size, seq_length, lengths)
+    
+    def _flatten_frames(self, x, lengths):
+        batch_size, seq_length, c, h, w = x.shape
+        if lengths is not None:
+            seq_length = int(lengths.max())
+            x = x[:, :seq_length]
+        # channels_last matches the backbone weights and hits the NHWC conv kernels
+        x = x.reshape(batch_size * seq_length, c, h, w).contiguous(memory_format=torch.channels_last)
+        return x, batch_size, seq_length
+    
+    def _classify(self, x, batch_size, seq_length, lengths):
+        # The LSTM is not batch_first, so the trained model sees every frame as a
+        # one-step sequence. Keep it that way for batch_size > 1 so sequences in a
+        # batch stay independent of each other.
+        x = x.view(1, batch_size * seq_length, 2048)
         x_lstm, _ = self.lstm(x, None)
-        return fmap, self.dp(self.linear1(x_lstm[:, -1, :]))
+        x_lstm = x_lstm.view(batch_size, seq_length, -1)
+        if lengths is None:
+            last = x_lstm[:, -1, :]
+        else:
+            last = x_lstm[torch.arange(batch_size, device=x_lstm.device), lengths.to(x_lstm.device) - 1]
+        return self.dp(self.linear1(last))
 
     @classmethod
-    def load_from_file(cls, model_path, **kwargs):
-        """Load model from a .pt file with correct architecture."""
+    def load_from_file(cls, model_path, device='cpu', quantize=False, **kwargs):
+        """Load model from a .pt file with correct architecture.
+        
+        When quantize is set and the target device is CPU, the LSTM and linear
+        layers are converted to INT8 with dynamic quantization after loading.
+        """
         # Create model with exact same parameters as training
-        model = cls(
+        config = dict(
             num_classes=kwargs.get('num_classes', 2),
             latent_dim=kwargs.get('latent_dim', 2048),
             lstm_layers=kwargs.get('lstm_layers', 1),
@@ -38,9 +82,68 @@ class DeepFakeDetector(nn.Module):
             bidirectional=kwargs.get('bidirectional', False)
         )
         
-        # Load weights
-        state_dict = torch.load(model_path, map_location=torch.device('cpu'))
-        model.load_state_dict(state_dict)
+        # Build on the meta device so no parameters are allocated or initialized,
+        # then adopt the checkpoint tensors loaded on the target device
+        with torch.device('meta'):
+            model = cls(**config)
+        state_dict = cls._load_state_dict(model_path, device)
+        model.load_state_dict(state_dict, assign=True)
+        model.lstm.flatten_parameters()
         model.eval()
         
-        return model
\ No newline at end of file
+        if quantize and torch.device(device).type == 'cpu':
+            model = cls.quantize_dynamic(model)
+        
+        return model
+    
+    @staticmethod
+    def _load_state_dict(model_path, device):
+        """Load checkpoint tensors onto device, via a safetensors copy of the checkpoint.
+        
+        Pickle checkpoints must be read whole before any tensor is usable, so the
+        .pt file is converted once to <name>.safetensors next to it; later loads
+        read that file tensor by tensor straight onto the target device.
+        """
+        device = torch.device(device)
+        try:
+            from safetensors import safe_open
+            from safetensors.torch import save_file
+        except ImportError:
+            return torch.load(model_path, map_location=device, mmap=True)
+        
+        st_path = os.path.splitext(model_path)[0] + '.safetensors'
+        if not os.path.exists(st_path) or os.path.getmtime(st_path) < os.path.getmtime(model_path):
+            state_dict = torch.load(model_path, map_location=torch.device('cpu'), mmap=True)
+            # Unique temp file, so concurrent conversions never write to the same path
+            fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(st_path))
+            os.close(fd)
+            try:
+                save_file({key: tensor.contiguous() for key, tensor in state_dict.items()}, tmp_path)
+                os.replace(tmp_path, st_path)
+            except Exception:
+                os.remove(tmp_path)
+                raise
+        
+        st_device = f'cuda:{device.index or 0}' if device.type == 'cuda' else device.type
+        with safe_open(st_path, framework='pt', device=st_device) as f:
+            return {key: f.get_tensor(key) for key in f.keys()}
+    
+    @staticmethod
+    def quantize_dynamic(model):
+        """Quantize the LSTM and linear layers to INT8 for CPU inference.
+        
+        Dynamic LSTM quantization requires biases. The trained LSTM has none, so
+        it is first rebuilt with zero biases, which leaves its outputs unchanged.
+        """
+        lstm = model.lstm
+        if not lstm.bias:
+            with torch.device('meta'):
+                biased = nn.LSTM(lstm.input_size, lstm.hidden_size, lstm.num_layers, bias=True,
+                                 batch_first=lstm.batch_first, bidirectional=lstm.bidirectional)
+            state_dict = lstm.state_dict()
+            for name, param in biased.named_parameters():
+                if name not in state_dict:
+                    state_dict[name] = torch.zeros(param.shape, dtype=param.dtype)
+            biased.load_state_dict(state_dict, assign=True)
+            model.lstm = biased
+        return torch.ao.quantization.quantize_dynamic(model, {nn.Linear, nn.LSTM}, dtype=torch.qint8, inplace=True)
@@ -3,12 +3,16 @@
 Debug script to test Hugging Face model loading , TEST TO SEE ALL WORKING LOAD, DOWNLOADE,ETC.
 """
 
+import argparse
+import importlib
 import os
 import sys
 from pathlib import Path
 from dotenv import load_dotenv
 import logging
 
+from model_files import MODEL_FILES, fetch_model_files
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -16,7 +20,8 @@ logger = logging.getLogger(__name__)
 # Load environment
 load_dotenv()
 
-def debug_hf_model():
+def debug_hf_model(refresh=False):
+    """Run the model loading checks; refresh re-downloads files even when cached."""
     print("🔍 Debugging Hugging Face Model Loading...")
     print("=" * 60)
     
@@ -31,56 +36,37 @@ def debug_hf_model():
         print("❌ No valid Hugging Face token!")
         return False
     
+    current_dir = str(Path(__file__).parent)
+    cache_dir = os.path.join(current_dir, 'model_cache')
+    
     # Test 1: Check if we can access the repo
     print(f"\n🧪 Test 1: Accessing repository...")
-    try:
-        from huggingface_hub import HfApi
-        api = HfApi()
-        
-        # List files in the repo
-        files = api.list_repo_files(repo_id=model_name, token=hf_token)
-        print(f"✅ Repository accessible")
-        print(f"Files in repo: {files}")
-        
-    except Exception as e:
-        print(f"❌ Cannot access repository: {e}")
-        return False
+    all_cached = all(os.path.exists(os.path.join(cache_dir, f)) for f in MODEL_FILES)
+    if all_cached and not refresh:
+        # Nothing to download, so skip the network round-trip (and the huggingface_hub import)
+        print("✅ Using cached files, skipping repository listing")
+    else:
+        try:
+            from huggingface_hub import HfApi
+            api = HfApi()
+            
+            # List files in the repo
+            files = api.list_repo_files(repo_id=model_name, token=hf_token)
+            print(f"✅ Repository accessible")
+            print(f"Files in repo: {files}")
+            
+        except Exception as e:
+            print(f"❌ Cannot access repository: {e}")
+            return False
     
     # Test 2: Try downloading files
     print(f"\n🧪 Test 2: Downloading model files...")
     try:
-        from huggingface_hub import hf_hub_download
-        
-        current_dir = Path(__file__).parent
-        cache_dir = os.path.join(current_dir, 'model_cache')
         os.makedirs(cache_dir, exist_ok=True)
         
-        files_to_download = [
-            'modeling_deepfake.py',
-            'processor_deepfake.py', 
-            'model_87_acc_20_frames_final_data.pt',
-            'config.json'
-        ]
+        downloaded_files = fetch_model_files(model_name, hf_token, cache_dir, refresh=refresh)
         
-        downloaded_files = {}
-        for filename in files_to_download:
-            try:
-                print(f"Downloading {filename}...")
-                file_path = hf_hub_download(
-                    repo_id=model_name,
-                    filename=filename,
-                    token=hf_token,
-                    local_dir=cache_dir,
-                    local_dir_use_symlinks=False
-                )
-                downloaded_files[filename] = file_path
-                print(f"✅ Downloaded {filename}")
-                
-            except Exception as file_error:
-                print(f"❌ Failed to download {filename}: {file_error}")
-                return False
-        
-        print(f"✅ All files downloaded to: {cache_dir}")
+        print(f"✅ All files available in: {cache_dir}")
         
     except Exception as e:
         print(f"❌ Download failed: {e}")
@@ -89,7 +75,12 @@ def debug_hf_model():
     # Test 3: Try importing custom modules
     print(f"\n🧪 Test 3: Importing custom modules...")
     try:
-        sys.path.insert(0, cache_dir)
+        # Make the local modules and the freshly downloaded model code importable
+        # once, with the cache taking precedence
+        for path in (current_dir, cache_dir):
+            if path not in sys.path:
+                sys.path.insert(0, path)
+        importlib.invalidate_caches()
         
         from modeling_deepfake import DeepFakeDetectorModel, DeepFakeDetectorConfig
         print("✅ DeepFakeDetectorModel imported successfully")
@@ -102,7 +93,6 @@ def debug_hf_model():
         except ImportError as e:
             print(f"⚠️ Original processor failed: {e}")
             print("Using simplified processor...")
-            sys.path.insert(0, str(Path(__file__).parent))
             from simple_processor import SimpleDeepFakeProcessor
             processor_class = SimpleDeepFakeProcessor
             print("✅ SimpleDeepFakeProcessor imported successfully")
@@ -128,11 +118,13 @@ def debug_hf_model():
             print(f"⚠️ Original model failed: {model_error}")
             print("Trying correct model architecture...")
             
-            # Add current directory to path for correct_model
-            sys.path.insert(0, str(Path(__file__).parent))
             from correct_model import DeepFakeDetector
             model = DeepFakeDetector.load_from_file(model_path)
             print("✅ Correct model architecture loaded successfully")
+            
+            # The app quantizes on CPU by default, so check that path loads too
+            DeepFakeDetector.load_from_file(model_path, quantize=True)
+            print("✅ INT8 quantized model loaded successfully")
         
         model.eval()
         
@@ -148,7 +140,11 @@ def debug_hf_model():
         return False
 
 if __name__ == "__main__":
-    success = debug_hf_model()
+    parser = argparse.ArgumentParser(description="Check that the Hugging Face model downloads and loads")
+    parser.add_argument('--refresh', action='store_true', help="re-download model files even if cached")
+    args = parser.parse_args()
+    
+    success = debug_hf_model(refresh=args.refresh)
     print("\n" + "=" * 60)
     if success:
         print("✅ All tests PASSED - Model should work in main app")
@@ -0,0 +1,76 @@
+"""
+Fetch the Hugging Face model files into the local cache
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Files needed from the model repository
+MODEL_FILES = [
+    'modeling_deepfake.py',
+    'processor_deepfake.py',
+    'model_87_acc_20_frames_final_data.pt',
+    'config.json'
+]
+
+
+def fetch_model_files(model_name, token, cache_dir, filenames=MODEL_FILES, refresh=False,
+                      max_in_flight=4, log=print):
+    """
+    Make sure every model file is in cache_dir, downloading missing ones concurrently.
+    
+    Args:
+        model_name: Hugging Face repository id
+        token: Hugging Face access token
+        cache_dir: Local directory holding the files
+        filenames: Files to fetch
+        refresh: Re-download files even if they are cached
+        max_in_flight: Maximum number of downloads running at the same time
+        log: Function called with progress messages
+        
+    Returns:
+        dict: Local path for each filename
+        
+    Raises:
+        RuntimeError: If a file could not be downloaded
+    """
+    local_files = {}
+    missing_files = []
+    for filename in filenames:
+        local_path = os.path.join(cache_dir, filename)
+        if os.path.exists(local_path) and not refresh:
+            log(f"✅ Using cached {filename}")
+            local_files[filename] = local_path
+        else:
+            missing_files.append(filename)
+    
+    if not missing_files:
+        return local_files
+    
+    from huggingface_hub import hf_hub_download
+    
+    def download(filename):
+        return hf_hub_download(
+            repo_id=model_name,
+            filename=filename,
+            token=token,
+            local_dir=cache_dir,
+            local_dir_use_symlinks=False,
+            force_download=refresh
+        )
+    
+    # Keep several requests in flight so TLS handshakes and the small files
+    # overlap with the large checkpoint transfer
+    with ThreadPoolExecutor(max_workers=min(max_in_flight, len(missing_files))) as executor:
+        futures = {}
+        for filename in missing_files:
+            log(f"📥 Downloading {filename}...")
+            futures[filename] = executor.submit(download, filename)
+        
+        for filename, future in futures.items():
+            try:
+                local_files[filename] = future.result()
+            except Exception as e:
+                raise RuntimeError(f"Failed to download {filename}: {e}") from e
+            log(f"✅ Downloaded {filename}")
+    
+    return local_files